@@ -1,4 +1,7 @@
 import os
+# Must be set before huggingface_hub is imported: parallel, high-throughput Xet downloads
+# for the first-run COCO fetch (replaces the deprecated HF_HUB_ENABLE_HF_TRANSFER).
+os.environ.setdefault("HF_XET_HIGH_PERFORMANCE", "1")
 from datasets import load_dataset
 from scripts.image_transform_pipeline import run_pipeline, ALL_SIMULATIONS
 import logging
@@ -1,17 +1,35 @@
 import os
+import io
 import shutil
-from glob import glob
 from tqdm import tqdm
 import csv
+import dataclasses
+import json
 import random
-from datasets import load_dataset
-from scripts.media_processes import SocialMediaSimulator
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from datasets import load_dataset, load_from_disk, Dataset, Features, Value, Image as HFImage
+from PIL import Image, ExifTags
+from scripts.media_processes import SocialMediaSimulator, SIMULATION_SPECS, DECODE_MIN_EDGE, copy_file, partial_path
 import concurrent.futures
+import itertools
+from collections import deque
 import logging
+import zlib
 
 random.seed(42)  
 
+# The metadata CSV is written through a 1 MiB buffer, in one writerows call per this many images.
+CSV_BUFFER_SIZE = 1 << 20
+CSV_BATCH_IMAGES = 64
+# Parquet metadata is written as zstd-compressed row groups of this many rows.
+PARQUET_ROW_GROUP_SIZE = 1000
+# How many local files beyond those already handed to workers get a read-ahead hint.
+READAHEAD_FILES = 16
+
 IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp', '.tiff', '.heic']
+IMAGE_EXTENSION_SET = frozenset(IMAGE_EXTENSIONS)
 
 ALL_SIMULATIONS = [
     "original", "whatsapp_document", "signal_document","telegram_document",
@@ -21,6 +39,30 @@ ALL_SIMULATIONS = [
     "telegram_media", 
 ]
 
+# The one-hot flag columns for a row produced by each simulation (never mutated; rows copy them).
+ONE_HOT = {name: [1 if sim == name else 0 for sim in ALL_SIMULATIONS] for name in ALL_SIMULATIONS}
+
+# Leading metadata columns; each row is followed by a one-hot flag per entry in ALL_SIMULATIONS.
+METADATA_COLUMNS = [
+    'original_path', 'original_filename', 'media_type', 'authenticity',
+    'source_model', 'source_model_details', 'processed_filename', 'processed_path'
+]
+
+
+_NON_NORMAL_COMPONENTS = frozenset({"", ".", ".."})
+
+def _relative_path(path, base_dir):
+    """
+    os.path.relpath(path, base_dir), short-cut to a string slice for the usual case where path
+    was built by joining onto base_dir (as the directory walk does).
+    """
+    prefix = base_dir if base_dir.endswith(os.sep) else base_dir + os.sep
+    if path.startswith(prefix):
+        relative = path[len(prefix):]
+        # Anything relpath would normalise away ('.', '..', empty components) takes the slow path.
+        if _NON_NORMAL_COMPONENTS.isdisjoint(relative.split(os.sep)):
+            return relative
+    return os.path.relpath(path, base_dir)
 
 def get_media_info(file_path, dataset_name, base_dir):
     """Extracts metadata from the file path and dataset info."""
@@ -31,7 +73,7 @@ def get_media_info(file_path, dataset_name, base_dir):
     source_model_details = None
     if dataset_name == "SAFE":
         try:
-            relative_dir_path = os.path.relpath(os.path.dirname(file_path), base_dir)
+            relative_dir_path = _relative_path(os.path.dirname(file_path), base_dir)
             # The model name is the first component of this relative path... he says... hopefully
             path_components = relative_dir_path.split(os.sep)
             source_model = path_components[0]
@@ -43,18 +85,157 @@ def get_media_info(file_path, dataset_name, base_dir):
     
     return media_type, original_filename, source_model, source_model_details
 
-def get_hf_dataset_paths(hf_name, cache_dir, target_sample_size, split='val', image_class="person"):
+def _find_rows_with_category(ds, target_id):
+    """
+    Returns the (ascending) indices of the rows whose objects.category list contains
+    target_id. Only the objects column is read, and the test runs as Arrow compute kernels.
+    """
+    objects = ds.select_columns(["objects"]).with_format("arrow")[:]["objects"]
+    categories = pc.struct_field(objects, "category")
+    # Flatten every row's category list, then map each match back to the row it came from.
+    matches = pc.equal(pc.list_flatten(categories), target_id)
+    return pc.unique(pc.filter(pc.list_parent_indices(categories), matches)).to_pylist()
+
+def _subset_cache_path(hf_name, cache_dir, target_sample_size, split, image_class, streaming=False):
+    """Where the sampled subset for these arguments is saved between runs."""
+    return os.path.join(
+        cache_dir, f"_filtered_{hf_name.replace('/', '--')}_{split}_{image_class or 'all'}_{target_sample_size}"
+        + ("_stream" if streaming else "")
+    )
+
+def _load_filter_indices(path, fingerprint):
+    """
+    Returns the cached class-filter indices at `path` if they were built from this exact
+    dataset, else None so the caller rebuilds them. An unreadable cache is logged.
+    """
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable filter index cache {path}, rebuilding it: {e}")
+        return None
+    if not isinstance(cached, dict) or not isinstance(cached.get("indices"), list):
+        logging.warning(f"Ignoring malformed filter index cache {path}, rebuilding it.")
+        return None
+    if cached.get("fingerprint") != fingerprint:
+        return None
+    return cached["indices"]
+
+def _save_filter_indices(path, fingerprint, indices):
+    """Writes the class-filter indices with the dataset fingerprint they belong to."""
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump({"fingerprint": fingerprint, "indices": indices}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not cache filter indices at {path}: {e}")
+
+def _save_subset(subset, path):
+    """
+    Saves the subset with save_to_disk, via a temporary directory so a partial save is never
+    reused. Returns True if the subset was saved.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        subset.save_to_disk(tmp_path)
+        os.replace(tmp_path, path)
+        logging.info(f"Saved sampled subset to {path}.")
+        return True
+    except Exception as e:
+        logging.warning(f"Could not cache sampled subset at {path}: {e}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return False
+
+# (hf_name, split, image_class) -> ClassLabel id of the class, looked up once per process.
+_CATEGORY_ID_CACHE = {}
+
+def _sample_streaming_split(hf_name, cache_dir, target_sample_size, split, image_class):
+    """
+    Streaming counterpart of the load/filter/sample steps of get_hf_dataset_paths, for splits
+    too large to download: rows are read once from the Hub, filtered by class on the fly and
+    reservoir-sampled, so only the sampled (still encoded) images are ever held in memory.
+    Returns the sampled subset with the same columns as the non-streaming path, or None
+    if the class can't be looked up.
+    """
+    stream = load_dataset(hf_name, split=split, streaming=True, cache_dir=cache_dir)
+    stream = stream.select_columns(["image", "objects"] if image_class else ["image"])
+    image_feature = dataclasses.replace(stream.features["image"], decode=True)
+    stream = stream.cast_column("image", HFImage(decode=False))
+
+    target_id = None
+    if image_class:
+        try:
+            target_id = stream.features["objects"]["category"].feature.str2int(image_class)
+        except (KeyError, AttributeError, ValueError) as e:
+            logging.error(f"Could not filter by class '{image_class}'. The dataset might not have the expected structure or class. Skipping dataset. Error: {e}")
+            return None
+        logging.info(f"Streaming '{split}' and filtering for class: '{image_class}'...")
+
+    matches = (
+        (idx, example["image"]) for idx, example in enumerate(stream)
+        if target_id is None or target_id in example["objects"]["category"]
+    )
+    sampled, num_found = _reservoir_sample(matches, target_sample_size)
+    if target_id is not None and not num_found:
+        # Same as the non-streaming path: a class with no matches falls back to all images.
+        logging.info(f"No images containing '{image_class}' in the stream. Using all images.")
+        return _sample_streaming_split(hf_name, cache_dir, target_sample_size, split, None)
+    logging.info(f"Sampled {len(sampled)} of {num_found} matching images from the stream.")
+
+    # Ascending row order, like the non-streaming path.
+    sampled.sort(key=lambda pair: pair[0])
+    return Dataset.from_dict(
+        {"image": [image for _, image in sampled], "source_index": [idx for idx, _ in sampled]},
+        features=Features({"image": image_feature, "source_index": Value("int64")}),
+    )
+
+def get_hf_dataset_paths(hf_name, cache_dir, target_sample_size, split='val', image_class="person", streaming=False):
     """
     Loads a HF dataset, finds original indices for a specific class, samples them,
-    and returns a list of (synthetic_path, original_index) tuples.
+    and returns the sampled subset of the split together with a synthetic filename
+    for each of its rows, i.e. (subset, [synthetic_name, ...]).
+    The subset is saved under cache_dir, so later runs skip loading and filtering.
+    With streaming=True the split is never downloaded; see _sample_streaming_split.
     """
+    subset_cache = _subset_cache_path(hf_name, cache_dir, target_sample_size, split, image_class, streaming)
+    if os.path.isdir(subset_cache):
+        try:
+            subset = load_from_disk(subset_cache)
+            logging.info(f"Loaded {len(subset)} previously sampled images from {subset_cache}.")
+            return subset, [f"{split}_{idx}.jpg" for idx in subset["source_index"]]
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable subset cache {subset_cache}: {e}")
+
+    if streaming:
+        logging.info(f"Streaming Hugging Face dataset '{hf_name}'...")
+        try:
+            subset = _sample_streaming_split(hf_name, cache_dir, target_sample_size, split, image_class)
+        except Exception as e:
+            logging.error(f"Failed to stream dataset '{hf_name}'. Reason: {e}")
+            return None, []
+        if subset is None:
+            return None, []
+        if not len(subset):
+            logging.error(f"No images found in the '{split}' stream of '{hf_name}'.")
+            return None, []
+        if _save_subset(subset, subset_cache):
+            # The sampled rows are held in memory; reload them memory-mapped like the
+            # non-streaming subset, so workers don't each receive a copy of the image bytes.
+            subset = load_from_disk(subset_cache)
+        return subset, [f"{split}_{idx}.jpg" for idx in subset["source_index"]]
+
     logging.info(f"Loading and processing Hugging Face dataset '{hf_name}'...")
     try:
         # Load the dataset dictionary
         dataset_dict = load_dataset(hf_name, cache_dir=cache_dir)
         if split not in dataset_dict:
             logging.error(f"Split '{split}' not found. Available: {list(dataset_dict.keys())}")
-            return []
+            return None, []
         
         ds = dataset_dict[split]
         logging.info(f"Original size of '{split}' split: {len(ds)} images.")
@@ -62,24 +243,31 @@ def get_hf_dataset_paths(hf_name, cache_dir, target_sample_size, split='val', im
         valid_indices = []
         if image_class:
             logging.info(f"Filtering for class: '{image_class}'...")
-            try:
-                # Correctly access the ClassLabel feature to get the integer ID for the class
-                category_feature = ds.features["objects"]["category"].feature
-                target_id = category_feature.str2int(image_class)
-
-                # Efficiently iterate over just the category column to find matching indices
-                logging.info("Scanning for matching images (this may take a moment)...")
-                for i, categories in enumerate(tqdm(ds['objects']['category'], desc="Filtering")):
-                    if target_id in categories:
-                        valid_indices.append(i)
-                logging.info(f"Found {len(valid_indices)} images containing '{image_class}'.")
-
-            except (KeyError, AttributeError, ValueError) as e:
-                logging.warning(f"Could not filter by class '{image_class}'. The dataset might not have the expected structure or class. Error: {e}")
-            except Exception as e:
-                logging.warning(f"An unexpected error occurred during filtering: {e}")
-
-        # If filtering was skipped, failed, or found nothing, use all original indices
+            category_key = (hf_name, split, image_class)
+            if category_key not in _CATEGORY_ID_CACHE:
+                try:
+                    # Correctly access the ClassLabel feature to get the integer ID for the class
+                    category_feature = ds.features["objects"]["category"].feature
+                    _CATEGORY_ID_CACHE[category_key] = category_feature.str2int(image_class)
+                except (KeyError, AttributeError, ValueError) as e:
+                    # A class that isn't in the schema is a misconfiguration; processing the whole split instead would be pointless.
+                    logging.error(f"Could not filter by class '{image_class}'. The dataset might not have the expected structure or class. Skipping dataset. Error: {e}")
+                    return None, []
+            target_id = _CATEGORY_ID_CACHE[category_key]
+
+            # The scan result only changes with the dataset itself, so it is cached under its fingerprint.
+            # An unreadable cache is rebuilt; a failing scan is reported by the handler below.
+            index_cache = os.path.join(cache_dir, f"_filter_idx__{hf_name.replace('/', '--')}__{split}__{image_class}.json")
+            valid_indices = _load_filter_indices(index_cache, ds._fingerprint)
+            if valid_indices is None:
+                logging.info("Scanning for matching images...")
+                valid_indices = _find_rows_with_category(ds, target_id)
+                _save_filter_indices(index_cache, ds._fingerprint, valid_indices)
+            else:
+                logging.info(f"Loaded cached filter indices from {index_cache}.")
+            logging.info(f"Found {len(valid_indices)} images containing '{image_class}'.")
+
+        # If filtering was skipped or found nothing, use all original indices
         if not valid_indices:
             logging.info("No valid images found after filtering, or filtering was skipped. Using all images.")
             valid_indices = list(range(len(ds)))
@@ -92,54 +280,196 @@ def get_hf_dataset_paths(hf_name, cache_dir, target_sample_size, split='val', im
             logging.info(f"Using all {len(valid_indices)} valid images.")
             sampled_indices = valid_indices
         
-        # Return list of (synthetic_name, original_index)
-        logging.info(f"Returning {len(sampled_indices)} indices for processing.")
-        return [(f"{split}_{idx}.jpg", idx) for idx in sampled_indices]
+        # Sorted indices keep the Arrow reads sequential when the subset is iterated.
+        sampled_indices = sorted(sampled_indices)
+        logging.info(f"Returning {len(sampled_indices)} images for processing.")
+        # Only the images are needed downstream; the original row index keeps the names stable.
+        subset = ds.select(sampled_indices).select_columns(["image"]).add_column("source_index", sampled_indices)
+        _save_subset(subset, subset_cache)
+        return subset, [f"{split}_{idx}.jpg" for idx in sampled_indices]
 
     except Exception as e:
         logging.error(f"Failed to load or process dataset '{hf_name}'. Reason: {e}")
-        return []
+        return None, []
     
 
+def _iter_images(root):
+    """
+    Yields the image files under root from a single directory walk, matching extensions
+    case-insensitively. Entries are visited in sorted order so sampling is reproducible,
+    and hidden files/directories are skipped like glob does. Symlinked directories are
+    followed, as glob's '**' did, since dataset trees are often assembled from links.
+    """
+    for dirpath, dirnames, filenames in os.walk(root, followlinks=True):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in sorted(filenames):
+            if not filename.startswith('.') and os.path.splitext(filename)[1].lower() in IMAGE_EXTENSION_SET:
+                yield os.path.join(dirpath, filename)
+
+
+def _reservoir_sample(items, k, rng=random):
+    """
+    Uniformly samples up to k items from an iterable in a single pass (Algorithm R),
+    holding at most k items in memory. Returns (sample, number_of_items_seen).
+    """
+    reservoir = []
+    seen = 0
+    for seen, item in enumerate(items, 1):
+        if seen <= k:
+            reservoir.append(item)
+        else:
+            j = rng.randrange(seen)
+            if j < k:
+                reservoir[j] = item
+    return reservoir, seen
+
+
+def _encode_jpeg(pil_img):
+    """Encodes a PIL image as an in-memory RGB JPEG and returns the bytes."""
+    buffer = io.BytesIO()
+    pil_img.convert("RGB").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def _encode_hf_image(image_feature, value):
+    """
+    Returns JPEG bytes for a raw HF image value. Stored JPEGs that already decode to upright RGB
+    are passed through untouched; anything else is decoded exactly as the dataset would and
+    re-encoded.
+    """
+    data = value.get("bytes")
+    if data and data[:2] == b"\xff\xd8" and image_feature.mode in (None, "RGB"):
+        try:
+            # Only the header is parsed here; the pixels are decoded later, once, by the worker.
+            with Image.open(io.BytesIO(data)) as img:
+                if img.mode == "RGB" and img.getexif().get(ExifTags.Base.Orientation) in (None, 1):
+                    return data
+        except Exception as e:
+            logging.warning(f"Could not inspect stored JPEG, re-encoding it: {e}")
+    return _encode_jpeg(image_feature.decode_example(value))
+
+
+def _scan_and_sample(model_dir, target_sample_size):
+    """Walks one model directory and reservoir-samples its images. Returns (sample, number_found)."""
+    # Sample while walking so only target_sample_size paths are ever held per model.
+    # Each model gets its own RNG, seeded from its name (crc32, since hash() is salted per process),
+    # so its sample doesn't depend on which other models exist or on scan order.
+    rng = random.Random(42 + zlib.crc32(os.path.basename(model_dir).encode()))
+    return _reservoir_sample(_iter_images(model_dir), target_sample_size, rng)
+
 def get_non_huggingface_dataset_paths(directory, target_sample_size):
     """
     Logic for the SAFE dataset folder structure. 
     Samples a specific number of images from each subdirectory (model).
     """
     all_files = []
-    model_dirs = [d.path for d in os.scandir(directory) if d.is_dir()]
+    model_dirs = sorted(d.path for d in os.scandir(directory) if d.is_dir())
     if not model_dirs:
         logging.warning(f"No model subdirectories found in {directory}")
         return []
 
     logging.info(f"Found {len(model_dirs)} model directories. Attempting to sample {target_sample_size} images from each.")
 
-    for model_dir in sorted(model_dirs):
-        model_image_files = []
-        for ext in IMAGE_EXTENSIONS:
-            model_image_files.extend(glob(os.path.join(model_dir, '**', f'*{ext}'), recursive=True))
-
-        if not model_image_files:
-            logging.warning(f"No images found in {os.path.basename(model_dir)}")
-            continue
-        if len(model_image_files) < target_sample_size:
-            logging.info(f"Found {len(model_image_files)} images in {os.path.basename(model_dir)} (less than target). Taking all.")
-            all_files.extend(model_image_files)
-        else:
-            logging.info(f"Sampling {target_sample_size} images from {os.path.basename(model_dir)}.")
-            all_files.extend(random.sample(model_image_files, target_sample_size))
+    # The walks are independent and I/O-bound, so they run on threads; map keeps the sorted order.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(32, len(model_dirs))) as executor:
+        samples = executor.map(_scan_and_sample, model_dirs, itertools.repeat(target_sample_size))
+        for model_dir, (sampled_files, num_found) in zip(model_dirs, samples):
+            model_name = os.path.basename(model_dir)
+            if not num_found:
+                logging.warning(f"No images found in {model_name}")
+                continue
+            if num_found < target_sample_size:
+                logging.info(f"Found {num_found} images in {model_name} (less than target). Taking all.")
+            else:
+                logging.info(f"Sampled {target_sample_size} of {num_found} images from {model_name}.")
+            all_files.extend(sampled_files)
     return all_files
 
 def get_standard_paths(directory):
-    """Standard recursive glob search for image files."""
-    files = []
-    for ext in IMAGE_EXTENSIONS:
-        files.extend(glob(os.path.join(directory, '**', f'*{ext}'), recursive=True))
-    return files
+    """Standard recursive search for image files."""
+    return list(_iter_images(directory))
+
+
+def _readahead(path):
+    """
+    Asks the kernel to start reading `path` into the page cache in the background, so a
+    worker opening it later doesn't wait on the disk. A no-op where posix_fadvise is missing.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
 
+def _map_chunk(func, chunk):
+    return [func(item) for item in chunk]
 
-def run_simulations_for_image(file_path, dataset_name, directory, simulator, authenticity, simulations_to_run, curated_dir, originals_dir):
-    """Runs all social media simulations for a single image and logs results."""
+
+def _bounded_map(executor, func, items, chunksize=1, max_pending=8):
+    """
+    Like executor.map(func, items, chunksize=chunksize), but pulls `items` lazily and keeps at
+    most `max_pending` chunks in flight, so memory held by pending results and pickled
+    payloads stays bounded instead of growing with the size of the dataset.
+    """
+    pending = deque()
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, chunksize))
+        if chunk:
+            pending.append(executor.submit(_map_chunk, func, chunk))
+        if pending and (len(pending) >= max_pending or not chunk):
+            yield from pending.popleft().result()
+        elif not chunk:
+            return
+
+
+def _prepare_output_dirs(curated_dir, simulations_to_run):
+    """
+    Creates the output directory of every requested simulation once, up front, and returns
+    {sim_name: directory} so the per-image code never has to join or create them.
+    """
+    output_dirs = {}
+    for sim_name in simulations_to_run:
+        output_dirs[sim_name] = os.path.join(curated_dir, "originals" if sim_name == "original" else sim_name)
+        os.makedirs(output_dirs[sim_name], exist_ok=True)
+    return output_dirs
+
+
+def _list_existing_outputs(output_dirs):
+    """
+    Returns {sim_name: frozenset of filenames already in its output directory}, using one
+    directory listing per simulation so reruns can skip finished outputs without a stat each.
+    """
+    return {
+        sim_name: frozenset(entry.name for entry in os.scandir(sim_dir))
+        for sim_name, sim_dir in output_dirs.items()
+    }
+
+
+def _output_exists(existing_outputs, sim_name, filepath):
+    if existing_outputs is None:
+        return os.path.exists(filepath)
+    return os.path.basename(filepath) in existing_outputs.get(sim_name, ())
+
+
+def run_simulations_for_image(file_path, dataset_name, directory, simulator, authenticity, simulations_to_run, output_dirs, source=None, existing_outputs=None, sim_pool=None):
+    """
+    Runs all social media simulations for a single image and logs results.
+    `output_dirs` maps each simulation to its (existing) directory, see _prepare_output_dirs.
+    `source` is what the simulator reads from: an in-memory buffer for Hugging Face
+    images, or the file path itself (the default) for local datasets.
+    `existing_outputs` is an optional snapshot from _list_existing_outputs; without it,
+    each output path is checked on disk.
+    `sim_pool` is an optional thread pool to run this image's simulations concurrently.
+    """
+    if source is None:
+        source = file_path
     rows_to_write = []
     try:
         media_type, original_filename, source_model, source_model_details = get_media_info(file_path, dataset_name, directory)
@@ -148,86 +478,87 @@ def run_simulations_for_image(file_path, dataset_name, directory, simulator, aut
         # This is crucial for datasets that have identical filenames in different subdirectories.
         try:
             # e.g., 'model_A/subdir/image.png' -> 'model_A_subdir_image'
-            relative_path = os.path.relpath(file_path, directory)
+            relative_path = _relative_path(file_path, directory)
             unique_base = os.path.splitext(relative_path)[0].replace(os.sep, '_')
         except ValueError:
             # Fallback for cases where relpath fails or for temporary files from Hugging Face datasets.
             unique_base = os.path.splitext(original_filename)[0]
+        original_ext = os.path.splitext(original_filename)[1]
 
         if "original" in simulations_to_run:
             # --- Save the original unprocessed image and log it ---
             try:
-                _, original_ext = os.path.splitext(original_filename)
                 original_save_filename = f"{unique_base}_original{original_ext}"
-                original_save_path = os.path.join(originals_dir, original_save_filename)
-                if os.path.exists(original_save_path):
+                original_save_path = os.path.join(output_dirs["original"], original_save_filename)
+                if _output_exists(existing_outputs, "original", original_save_path):
                     logging.info(f"Skipping existing original file: {original_save_path}")
                 else:
-                    shutil.copy2(file_path, original_save_path)
+                    # Written beside the final name and renamed into place, so an interrupted
+                    # copy is never mistaken for a finished one on the next run.
+                    tmp_path = partial_path(original_save_path)
+                    if isinstance(source, str):
+                        # Contents only: permissions, timestamps and xattrs are not part of the dataset.
+                        copy_file(source, tmp_path)
+                    else:
+                        with open(tmp_path, 'wb') as f:
+                            f.write(source.getbuffer())
+                    os.replace(tmp_path, original_save_path)
 
                     # Prepare and write the row for the original image to the CSV.
                     base_row_data = [file_path, original_filename, media_type, authenticity, source_model, source_model_details, original_save_filename, original_save_path]
-                    one_hot_sims = [1 if sim == "original" else 0 for sim in ALL_SIMULATIONS]
-                    rows_to_write.append(base_row_data + one_hot_sims)
+                    rows_to_write.append(base_row_data + ONE_HOT["original"])
             except Exception as e:
                 logging.warning(f"Could not save or log original file {original_filename}: {e}")
 
-        all_simulations_map = {
-            "facebook": lambda: simulator.facebook(file_path),
-            # Instagram
-            "instagram_feed": lambda: simulator.instagram(file_path, post_type='feed'),
-            "instagram_story": lambda: simulator.instagram(file_path, post_type='story'),
-            "instagram_reel": lambda: simulator.instagram(file_path, post_type='reel'),
-            # TikTok
-            "tiktok": lambda: simulator.tiktok(file_path),
-            # WhatsApp
-            "whatsapp_standard_media": lambda: simulator.whatsapp(file_path, quality_mode='standard', upload_type='media'),
-            "whatsapp_high_media": lambda: simulator.whatsapp(file_path, quality_mode='high', upload_type='media'),
-            "whatsapp_document": lambda: simulator.whatsapp(file_path, upload_type='document'),
-            # Signal
-            "signal_standard_media": lambda: simulator.signal(file_path, quality_setting='standard', as_document=False),
-            "signal_high_media": lambda: simulator.signal(file_path, quality_setting='high', as_document=False),
-            "signal_document": lambda: simulator.signal(file_path, as_document=True),
-            # Telegram
-            "telegram_media": lambda: simulator.telegram(file_path, as_document=False),
-            "telegram_document": lambda: simulator.telegram(file_path, as_document=True),
-        }
-
+        # Work out which simulations still need to run and where their outputs go.
+        pending = []
         for sim_name in simulations_to_run:
             if sim_name == "original":
                 continue # Already handled
-            sim_func = all_simulations_map.get(sim_name)
-            if not sim_func:
+            spec = SIMULATION_SPECS.get(sim_name)
+            if not spec:
                 logging.warning(f"Unknown simulation '{sim_name}' requested. Skipping.")
                 continue
-            try:
-                _, original_ext = os.path.splitext(original_filename)
-                # Most simulations convert to JPG, but 'document' types preserve the original file extension.
-                processed_ext = original_ext if 'document' in sim_name else ".jpg"
-                output_dir = os.path.join(curated_dir, sim_name)
-                new_filename = f"{unique_base}_{sim_name}{processed_ext}"
-                new_filepath = os.path.join(output_dir, new_filename)
-
-                if os.path.exists(new_filepath):
-                    logging.info(f"Skipping existing simulation file: {new_filepath}")
-                    continue
+            # Most simulations convert to JPG, but 'document' types preserve the original file extension.
+            processed_ext = original_ext if 'document' in sim_name else ".jpg"
+            new_filename = f"{unique_base}_{sim_name}{processed_ext}"
+            new_filepath = os.path.join(output_dirs[sim_name], new_filename)
 
-                sim_func()
-
-                # The simulator API saves output to a platform-specific subdirectory (e.g., 'facebook', 'instagram').
-                platform_dir_name = sim_name.split('_')[0]
-                temp_output_path = os.path.join(simulator.base_output_dir, platform_dir_name, f"TEMPOUT{processed_ext}")
-                if os.path.exists(temp_output_path):
-                    # Define the final, specific directory for this simulation (e.g., "instagram_story").
-                    os.makedirs(output_dir, exist_ok=True)
-
-                    # Move the processed file from the temp location to its final destination.
-                    shutil.move(temp_output_path, new_filepath)
+            if _output_exists(existing_outputs, sim_name, new_filepath):
+                logging.info(f"Skipping existing simulation file: {new_filepath}")
+                continue
+            pending.append((sim_name, spec, new_filename, new_filepath))
+
+        # Decoded once and shared by every simulation that re-encodes the image;
+        # document uploads copy the file as-is and never need it.
+        image = None
+        decode_edges = [DECODE_MIN_EDGE[sim_name] for sim_name, *_ in pending if 'document' not in sim_name]
+        if decode_edges:
+            # Decoded only as large as the most demanding pending simulation needs.
+            image = simulator.decode_once(source, min_edge=max(decode_edges))
+
+        def run_one(sim_name, spec, new_filepath):
+            method_name, kwargs = spec
+            if 'document' not in sim_name:
+                # Threads each get their own copy: Pillow's save() stores its options on the image.
+                kwargs = dict(kwargs, image=image.copy() if sim_pool is not None and image is not None else image)
+            # The simulator returns the output path only if it wrote the file successfully; it
+            # writes a partial file first, so a failed or killed simulation leaves nothing behind.
+            return getattr(simulator, method_name)(source, output_path=new_filepath, **kwargs)
+
+        if sim_pool is not None:
+            # Pillow's codecs release the GIL, so the simulations of one image can overlap.
+            outcomes = [sim_pool.submit(run_one, sim_name, spec, new_filepath) for sim_name, spec, _, new_filepath in pending]
+        else:
+            outcomes = [None] * len(pending)
 
+        for (sim_name, spec, new_filename, new_filepath), future in zip(pending, outcomes):
+            try:
+                written = future.result() if future is not None else run_one(sim_name, spec, new_filepath)
+                if written:
                     # Prepare and write the single, one-hot encoded row to the CSV.
                     base_row_data = [file_path, original_filename, media_type, authenticity, source_model, source_model_details, new_filename, new_filepath]
-                    one_hot_sims = [1 if sim == sim_name else 0 for sim in ALL_SIMULATIONS]
-                    rows_to_write.append(base_row_data + one_hot_sims)
+                    rows_to_write.append(base_row_data + ONE_HOT[sim_name])
             except Exception as e:
                 logging.error(f"Simulation '{sim_name}' failed for {original_filename}: {e}")
 
@@ -237,34 +568,116 @@ def run_simulations_for_image(file_path, dataset_name, directory, simulator, aut
     return rows_to_write
 
 
-def _process_item_worker(args):
+class ParquetMetadataWriter:
     """
-    A picklable, top-level worker function for parallel processing. It now only
-    takes a file path and the necessary metadata to process it.
+    A writerows()-compatible stand-in for csv.writer that stores the metadata as a
+    zstd-compressed Parquet file. Rows are buffered and written in row groups of exactly
+    row_group_size rows (PARQUET_ROW_GROUP_SIZE by default); only the last group, written
+    on close(), may be smaller. Rows already in an existing file are carried over, matching
+    the CSV's append mode, and regrouped along with the new ones.
     """
-    (file_path, dataset_name, base_directory, destination_directory, 
-     authenticity, simulations_to_run) = args
-
-    curated_dir = destination_directory
-    
-    # Create a unique temporary directory for this worker process to avoid race conditions.
-    # A random integer is added to the process ID for extra robustness.
-    worker_temp_dir = os.path.join(curated_dir, f"worker_temp_{os.getpid()}_{random.randint(0, 999999)}")
-    
-    try:
-        originals_dir = os.path.join(curated_dir, "originals")
-        # Instantiate the simulator with the unique temp dir as its base output directory.
-        simulator = SocialMediaSimulator(base_output_dir=worker_temp_dir)
-        
-        # The base_directory argument is used for calculating the relative path for unique filenames.
-        return run_simulations_for_image(
-            file_path, dataset_name, base_directory, simulator, 
-            authenticity, simulations_to_run, curated_dir, originals_dir
+    def __init__(self, path, row_group_size=PARQUET_ROW_GROUP_SIZE):
+        self.path = path
+        self.row_group_size = row_group_size
+        self.schema = pa.schema(
+            [(column, pa.string()) for column in METADATA_COLUMNS] + [(sim, pa.int8()) for sim in ALL_SIMULATIONS]
         )
-    finally:
-        # Clean up the worker's temporary directory after it's done.
-        if os.path.exists(worker_temp_dir):
-            shutil.rmtree(worker_temp_dir)
+        # Tables not yet written, and how many rows they hold in total.
+        self._pending_tables = []
+        self._pending_count = 0
+        # Parquet files can't be appended to, so write a new file and swap it in on close.
+        self._tmp_path = f"{path}.tmp"
+        self._writer = pq.ParquetWriter(self._tmp_path, self.schema, compression="zstd")
+        if os.path.exists(path):
+            self._add(pq.read_table(path, schema=self.schema))
+
+    def writerows(self, rows):
+        if not rows:
+            return
+        columns = zip(*rows)
+        arrays = [pa.array(values, type=field.type) for values, field in zip(columns, self.schema)]
+        self._add(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def _add(self, table):
+        self._pending_tables.append(table)
+        self._pending_count += table.num_rows
+        if self._pending_count >= self.row_group_size:
+            self._flush(full_groups_only=True)
+
+    def _flush(self, full_groups_only=False):
+        """Writes the pending rows; with full_groups_only, keeps back the incomplete last group."""
+        pending = pa.concat_tables(self._pending_tables) if self._pending_tables else None
+        if pending is None or not pending.num_rows:
+            return
+        count = pending.num_rows
+        if full_groups_only:
+            count -= count % self.row_group_size
+        if count:
+            self._writer.write_table(pending.slice(0, count), row_group_size=self.row_group_size)
+        rest = pending.slice(count)
+        self._pending_tables = [rest] if rest.num_rows else []
+        self._pending_count = rest.num_rows
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Per-process state, populated once by _init_worker when the process pool starts.
+_worker_state = {}
+
+def _init_worker(dataset_name, base_directory, destination_directory, authenticity, simulations_to_run, output_dirs, existing_outputs, sim_threads=1, hf_images=None):
+    """
+    Process pool initializer. Stores the per-run settings and creates a single
+    SocialMediaSimulator that is reused for every item this worker processes.
+    `hf_images` is the sampled HF subset with undecoded images; it is memory-mapped,
+    so every worker reads rows from it directly instead of receiving image data.
+    """
+    # Outputs are written directly to their final paths, so workers never share temp files.
+    _worker_state.update(
+        simulator=SocialMediaSimulator(base_output_dir=destination_directory),
+        dataset_name=dataset_name,
+        base_directory=base_directory,
+        output_dirs=output_dirs,
+        authenticity=authenticity,
+        simulations_to_run=simulations_to_run,
+        existing_outputs=existing_outputs,
+        sim_pool=concurrent.futures.ThreadPoolExecutor(max_workers=sim_threads) if sim_threads > 1 else None,
+        hf_images=hf_images,
+        # The subset's image column is cast to decode=False; decode with an otherwise identical feature.
+        hf_image_feature=dataclasses.replace(hf_images.features["image"], decode=True) if hf_images is not None else None,
+    )
+
+def _process_item_worker(args):
+    """
+    A picklable, top-level worker function for parallel processing. It only takes
+    a file path and, for Hugging Face items, the row of the image in the sampled subset;
+    everything else comes from the state set up by _init_worker.
+    """
+    file_path, hf_row = args
+
+    source = None
+    if hf_row is not None:
+        raw_image = _worker_state["hf_images"][hf_row]["image"]
+        image_bytes = _encode_hf_image(_worker_state["hf_image_feature"], raw_image)
+        # Name the buffer so the simulator can infer the file extension from it.
+        source = io.BytesIO(image_bytes)
+        source.name = file_path
+
+    # The base_directory is used for calculating the relative path for unique filenames.
+    return run_simulations_for_image(
+        file_path, _worker_state["dataset_name"], _worker_state["base_directory"], _worker_state["simulator"],
+        _worker_state["authenticity"], _worker_state["simulations_to_run"],
+        _worker_state["output_dirs"], source,
+        _worker_state["existing_outputs"], _worker_state["sim_pool"]
+    )
 
 def run_pipeline(
     dataset_name: str,
@@ -276,22 +689,31 @@ def run_pipeline(
     simulations_to_run: list,
     hf_name: str = None,
     target_sample_size: int = 2000,
-    max_workers: int = None
+    max_workers: int = None,
+    metadata_format: str = "csv",
+    sim_threads: int = 1,
+    streaming: bool = False
 ):
     logging.info(f"--- Starting Image Curation Pipeline for {dataset_name} ---")
 
+    if metadata_format not in ("csv", "parquet"):
+        logging.error(f"Unsupported metadata_format '{metadata_format}'. Use 'csv' or 'parquet'.")
+        return
+
     # 1. Setup destination directories
     CURATED_DIR = destination_directory
     os.makedirs(CURATED_DIR, exist_ok=True)
-    ORIGINALS_DIR = os.path.join(CURATED_DIR, "originals")
-    os.makedirs(ORIGINALS_DIR, exist_ok=True)
+    # Originals are always kept; unknown simulation names get no directory.
+    output_dirs = _prepare_output_dirs(CURATED_DIR, [sim for sim in ALL_SIMULATIONS if sim == "original" or sim in simulations_to_run])
 
     directory = image_directory_path
     authenticity = "synthetic" if is_synthetic else "authentic"
 
     # 2. Path/Data Discovery
     files_to_process = []
-    hf_temp_dir = None
+    # Row of each entry of files_to_process in the HF subset (None for files on disk).
+    hf_rows = []
+    hf_images = None
     # This is the directory against which relpath is calculated for unique names
     base_directory_for_relpath = directory
 
@@ -299,94 +721,85 @@ def run_pipeline(
         if not hf_name:
             logging.error(f"Hugging Face dataset name (hf_name) must be provided for {dataset_name}.")
             return
-        
-        # Create a temporary directory to store materialized images from the HF dataset
-        hf_temp_dir = os.path.join(directory, "hf_temp_images")
-        os.makedirs(hf_temp_dir, exist_ok=True)
-        base_directory_for_relpath = hf_temp_dir # Adjust base for relpath calculation
-
-        logging.info("Loading Hugging Face dataset and materializing images to temp files...")
-        dataset_obj = load_dataset(hf_name, cache_dir=directory)
-        hf_items = get_hf_dataset_paths(hf_name, directory, target_sample_size)
-
-        for synthetic_name, idx in tqdm(hf_items, desc="Materializing HF images"):
-            split = synthetic_name.split('_')[0]
-            pil_img = dataset_obj[split][idx]['image']
-            
-            # Save the image to a temporary file that the worker can access
-            temp_path = os.path.join(hf_temp_dir, synthetic_name)
-            pil_img.convert("RGB").save(temp_path)
-            files_to_process.append(temp_path)
+
+        logging.info("Loading Hugging Face dataset; workers decode and encode images in memory...")
+        hf_subset, hf_names = get_hf_dataset_paths(hf_name, directory, target_sample_size, streaming=streaming)
+        # Each JPEG stays in memory; the path is virtual and only used for naming and metadata.
+        files_to_process = [os.path.join(directory, synthetic_name) for synthetic_name in hf_names]
+        hf_rows = range(len(files_to_process))
+        if hf_subset is not None:
+            # Workers share the memory-mapped subset and fetch the raw image bytes themselves,
+            # so no image data is pickled across the process boundary.
+            hf_images = hf_subset.select_columns(["image"]).cast_column("image", HFImage(decode=False))
     else:
         # Standard local file search
         if has_subdirectories:
             files_to_process = get_non_huggingface_dataset_paths(directory, target_sample_size)
         else:
             files_to_process = get_standard_paths(directory)
+        hf_rows = [None] * len(files_to_process)
 
     if not files_to_process:
         logging.info(f"No files found for processing. Exiting.")
         return
 
     # 3. Setup
-    metadata_path = os.path.join(CURATED_DIR, f"{dataset_name}_metadata.csv")
-    write_header = not os.path.exists(metadata_path)
+    metadata_path = os.path.join(CURATED_DIR, f"{dataset_name}_metadata.{metadata_format}")
 
-    # 4. Parallel Processing Loop
-    tasks = [
-        (file_path, dataset_name, base_directory_for_relpath, destination_directory, 
-         authenticity, simulations_to_run) 
-        for file_path in files_to_process
-    ]
+    # Snapshot finished outputs once so reruns skip them without touching the disk per output.
+    existing_outputs = _list_existing_outputs(output_dirs)
 
-    all_rows = []
+    # 4. Parallel Processing Loop
+    tasks = zip(files_to_process, hf_rows)
 
     num_workers = max_workers
     if num_workers is None:
         # Default to all cores minus one to leave resources for other tasks, but always use at least 1.
         cpu_count = os.cpu_count() or 1
-        num_workers = max(1, cpu_count // 2)
+        num_workers = max(1, cpu_count - 1)
 
-    logging.info(f"Starting parallel processing with {num_workers} workers.")
+    # Hand out work in chunks to cut IPC overhead, while keeping enough chunks per worker to balance load.
+    chunksize = min(32, max(1, len(files_to_process) // (num_workers * 4)))
 
-    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
-        # Use tqdm to show progress for the parallel execution
-        results = tqdm(executor.map(_process_item_worker, tasks), total=len(tasks), desc=f"Curating {dataset_name}")
-        for result_rows in results:
-            if result_rows:
-                all_rows.extend(result_rows)
+    logging.info(f"Starting parallel processing with {num_workers} workers (chunksize {chunksize}, {sim_threads} simulation threads each).")
 
-    # 5. Write all results to CSV at once
-    with open(metadata_path, 'a', newline='') as csv_file:
-        csv_writer = csv.writer(csv_file)
+    # 5. Stream results to the metadata file from the main process only.
+    if metadata_format == "parquet":
+        metadata_file = metadata_writer = ParquetMetadataWriter(metadata_path)
+    else:
+        write_header = not os.path.exists(metadata_path)
+        # The 1 MiB buffer sits under the text layer, so writerows batches reach the disk in few write() calls.
+        metadata_file = open(metadata_path, 'a', newline='', encoding='utf-8', buffering=CSV_BUFFER_SIZE)
+        metadata_writer = csv.writer(metadata_file)
         if write_header:
-            header = [
-                'original_path', 'original_filename', 'media_type', 'authenticity',
-                'source_model', 'source_model_details', 'processed_filename', 'processed_path'
-            ]
-            header.extend(ALL_SIMULATIONS)
-            csv_writer.writerow(header)
-        if all_rows:
-            csv_writer.writerows(all_rows)
-
-    # 6. Cleanup
-    # Clean up the temporary directory used for Hugging Face images
-    if hf_temp_dir and os.path.exists(hf_temp_dir):
-        logging.info(f"Cleaning up temporary Hugging Face image directory: {hf_temp_dir}")
-        shutil.rmtree(hf_temp_dir)
-
-    # The simulator API creates base directories (e.g., 'instagram') to store temp files.
-    # After the pipeline moves these files to their final specific directories (e.g., 'instagram_story'),
-    # these base directories are left empty. This step removes them.
-    logging.info("Cleaning up empty intermediate directories...")
-    platforms_with_subtypes = ["instagram", "whatsapp", "signal", "telegram"]
-    for platform in platforms_with_subtypes:
-        intermediate_dir_path = os.path.join(CURATED_DIR, platform)
-        try:
-            if os.path.isdir(intermediate_dir_path) and not os.listdir(intermediate_dir_path):
-                os.rmdir(intermediate_dir_path)
-                logging.info(f"Removed empty directory: {platform}")
-        except OSError as e:
-            logging.warning(f"Could not remove directory {intermediate_dir_path}: {e}")
+            metadata_writer.writerow(METADATA_COLUMNS + ALL_SIMULATIONS)
+
+    with metadata_file, concurrent.futures.ProcessPoolExecutor(
+        max_workers=num_workers,
+        initializer=_init_worker,
+        initargs=(dataset_name, base_directory_for_relpath, destination_directory, authenticity, simulations_to_run, output_dirs, existing_outputs, sim_threads, hf_images),
+    ) as executor:
+
+        # Local files are hinted ahead of the workers (HF images come from the dataset cache).
+        readahead_paths = [] if is_huggingface else files_to_process
+        lookahead = num_workers * chunksize + READAHEAD_FILES
+        for path in readahead_paths[:lookahead]:
+            _readahead(path)
+
+        # Use tqdm to show progress for the parallel execution. At most two chunks per
+        # worker are queued at a time.
+        results = tqdm(
+            _bounded_map(executor, _process_item_worker, tasks, chunksize=chunksize, max_pending=2 * num_workers),
+            total=len(files_to_process), desc=f"Curating {dataset_name}",
+        )
+        row_batch = []
+        for images_done, result_rows in enumerate(results, 1):
+            if images_done + lookahead - 1 < len(readahead_paths):
+                _readahead(readahead_paths[images_done + lookahead - 1])
+            row_batch.extend(result_rows)
+            if images_done % CSV_BATCH_IMAGES == 0:
+                metadata_writer.writerows(row_batch)
+                row_batch.clear()
+        metadata_writer.writerows(row_batch)
 
     logging.info(f"--- {dataset_name} Curation Finished ---")
\ No newline at end of file
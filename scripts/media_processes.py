@@ -1,35 +1,314 @@
 import os
+import io
+import errno
 import hashlib
 import shutil
+import functools
 import subprocess
+import concurrent.futures
 from datetime import datetime
-from PIL import Image, ImageCms, ImageOps
+from PIL import Image, ImageCms, ImageOps, features
 import logging
 
 """
 This is a copy of the media processing pipelines from the main project repo.
 """
 
+# JPEG encode/decode dominates the image simulations. Pillow's wheels ship the SIMD
+# libjpeg-turbo codec; flag source builds that fell back to plain libjpeg.
+if not features.check_feature("libjpeg_turbo"):
+    logging.warning("Pillow is not using libjpeg-turbo; JPEG encoding and decoding will be significantly slower.")
+
+# copy_file_range failures that just mean "not supported here", so copy_file falls back.
+_COPY_FILE_RANGE_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+def copy_file(src, dst):
+    """
+    Copies the contents of src to dst. Uses copy_file_range where available, so the data
+    never leaves the kernel and CoW filesystems (Btrfs, XFS) can clone it instead of copying;
+    otherwise falls back to shutil.copyfile.
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if not copied:
+                        break
+                    remaining -= copied
+            if remaining <= 0:
+                return
+        except OSError as e:
+            if e.errno not in _COPY_FILE_RANGE_UNSUPPORTED:
+                raise
+    shutil.copyfile(src, dst)
+
+def partial_path(path):
+    """
+    Returns the hidden sibling of path that an output is written to before it is renamed
+    into place. It keeps the extension so encoders still infer the format from it.
+    """
+    directory, filename = os.path.split(path)
+    stem, ext = os.path.splitext(filename)
+    return os.path.join(directory, f".{stem}.partial{ext}")
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _writes_atomically(method):
+    """
+    Makes a platform method write an explicit output_path via partial_path and os.replace
+    it into place only once the method reports success. A killed or crashed run therefore
+    never leaves a truncated file under the final name, which later runs would skip as done.
+    """
+    @functools.wraps(method)
+    def wrapper(self, input_path, *args, output_path=None, **kwargs):
+        if output_path is None:
+            return method(self, input_path, *args, **kwargs)
+        tmp_path = partial_path(output_path)
+        done = False
+        try:
+            if method(self, input_path, *args, output_path=tmp_path, **kwargs):
+                os.replace(tmp_path, output_path)
+                done = True
+        finally:
+            if not done:
+                _discard(tmp_path)
+        return output_path if done else None
+    return wrapper
+
+# How each simulation is run: name -> (SocialMediaSimulator method, keyword arguments).
+# Built once at import instead of a dict of closures per image.
+SIMULATION_SPECS = {
+    "facebook": ("facebook", {}),
+    # Instagram
+    "instagram_feed": ("instagram", {"post_type": "feed"}),
+    "instagram_story": ("instagram", {"post_type": "story"}),
+    "instagram_reel": ("instagram", {"post_type": "reel"}),
+    # TikTok
+    "tiktok": ("tiktok", {}),
+    # WhatsApp
+    "whatsapp_standard_media": ("whatsapp", {"quality_mode": "standard", "upload_type": "media"}),
+    "whatsapp_high_media": ("whatsapp", {"quality_mode": "high", "upload_type": "media"}),
+    "whatsapp_document": ("whatsapp", {"upload_type": "document"}),
+    # Signal
+    "signal_standard_media": ("signal", {"quality_setting": "standard", "as_document": False}),
+    "signal_high_media": ("signal", {"quality_setting": "high", "as_document": False}),
+    "signal_document": ("signal", {"as_document": True}),
+    # Telegram
+    "telegram_media": ("telegram", {"as_document": False}),
+    "telegram_document": ("telegram", {"as_document": True}),
+}
+
+# The size (in both dimensions) each simulation needs from a shared decode before it resizes,
+# so decode_once can let libjpeg decode large JPEGs at a reduced scale without losing detail.
+DECODE_MIN_EDGE = {
+    "facebook": 2048,
+    "instagram_feed": 1080, "instagram_story": 1920, "instagram_reel": 1920,
+    "tiktok": 1920,
+    "whatsapp_standard_media": 1600, "whatsapp_high_media": 4096,
+    "signal_standard_media": 1600, "signal_high_media": 4096,
+    "telegram_media": 1280,
+}
+
+@functools.lru_cache(maxsize=1024)
+def _probe_video_dimensions(input_path, mtime_ns, size):
+    """
+    Runs ffprobe for the (width, height) of the first video stream. Cached per process;
+    mtime and size are part of the key so a rewritten file is probed again.
+    """
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=width,height", "-of", "csv=s=x:p=0", input_path
+    ]
+    output = subprocess.check_output(cmd).decode("utf-8").strip()
+    width, height = map(int, output.split('x'))
+    return width, height
+
+# Built once; the target of every embedded-profile conversion.
+_SRGB_PROFILE = ImageCms.createProfile("sRGB")
+
+@functools.lru_cache(maxsize=32)
+def _to_srgb_transform(icc_profile):
+    """
+    Builds (once per distinct embedded profile) the LittleCMS transform from an image's
+    ICC profile to sRGB, so batches sharing a camera profile reuse one LUT.
+    """
+    input_profile = ImageCms.getOpenProfile(io.BytesIO(icc_profile))
+    return ImageCms.buildTransform(input_profile, _SRGB_PROFILE, "RGB", "RGB")
+
+# Hardware H.264 encoders in order of preference; libx264 is the fallback.
+HARDWARE_H264_ENCODERS = ['h264_nvenc', 'h264_qsv', 'h264_videotoolbox']
+
+@functools.lru_cache(maxsize=None)
+def _detect_h264_encoder():
+    """
+    Returns the first hardware H.264 encoder that ffmpeg was built with and that can
+    actually open a device here (checked with a tiny test encode), else 'libx264'.
+    Runs once per process.
+    """
+    try:
+        listing = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'],
+                                 capture_output=True, text=True, check=True).stdout
+    except Exception:
+        return 'libx264'
+
+    for encoder in HARDWARE_H264_ENCODERS:
+        if encoder not in listing:
+            continue
+        test_cmd = ['ffmpeg', '-hide_banner', '-v', 'error', '-f', 'lavfi', '-i', 'color=size=256x256:duration=0.1',
+                    '-c:v', encoder, '-f', 'null', '-']
+        if subprocess.run(test_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0:
+            logging.info(f"Using hardware H.264 encoder: {encoder}")
+            return encoder
+    return 'libx264'
+
+def _draft(img, size):
+    """
+    For JPEGs, asks libjpeg to decode at the smallest 1/2, 1/4 or 1/8 DCT scale that still
+    covers `size`; a no-op for other formats or if the image was already loaded.
+    """
+    if img.format == "JPEG" and size:
+        img.draft(None, size)
+    return img
+
 class SocialMediaSimulator:
-    def __init__(self, base_output_dir="media_output"):
+    def __init__(self, base_output_dir="media_output", ffmpeg_threads=0, h264_encoder='libx264'):
+        """
+        ffmpeg_threads: libx264 worker threads per video encode; 0 lets x264 size its
+        frame-thread pool to the machine. Lower it when running several simulators at once.
+        h264_encoder: ffmpeg H.264 encoder for video outputs. The default, libx264, is what the
+        simulated platforms use, so the compression artefacts don't depend on the host.
+        Hardware encoders (see HARDWARE_H264_ENCODERS) are opt-in: pass one by name, or None
+        to pick a working one automatically. A failed hardware encode is retried with libx264.
+        """
         self.base_output_dir = base_output_dir
+        self.ffmpeg_threads = ffmpeg_threads
+        self.h264_encoder = h264_encoder
+        # Directories already created (or known to exist), so each is only made once.
+        self._known_dirs = set()
+
+        self._ensure_dir(self.base_output_dir)
+
+    def _video_encoder(self):
+        return self.h264_encoder or _detect_h264_encoder()
 
-        if not os.path.exists(self.base_output_dir):
-            os.makedirs(self.base_output_dir)
+    def _h264_args(self, preset, encoder='libx264'):
+        """
+        Encoder arguments for an H.264 output. preset is the libx264 speed preset; hardware
+        encoders use their own equivalent, with the same bitrate targets set by the caller.
+        """
+        if encoder == 'h264_nvenc':
+            return ['-c:v', encoder, '-preset', 'p4']
+        if encoder == 'h264_qsv':
+            return ['-c:v', encoder, '-preset', preset]
+        if encoder == 'h264_videotoolbox':
+            return ['-c:v', encoder]
+        # Frame threading (not sliced threads) keeps rate control and compression unchanged.
+        return ['-c:v', 'libx264', '-preset', preset,
+                '-threads', str(self.ffmpeg_threads), '-x264-params', 'sliced-threads=0']
+
+    def _run_ffmpeg(self, build_cmd):
+        """
+        Runs the ffmpeg command build_cmd(encoder) returns for the configured H.264 encoder.
+        If a hardware encoder fails (e.g. the GPU has no free encode sessions), the command is
+        run again with libx264. Raises CalledProcessError if the encode still fails.
+        """
+        encoder = self._video_encoder()
+        try:
+            subprocess.run(build_cmd(encoder), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except subprocess.CalledProcessError:
+            if encoder == 'libx264':
+                raise
+            logging.warning(f"{encoder} encode failed; retrying with libx264.")
+            subprocess.run(build_cmd('libx264'), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def _encode_video(self, input_path, output_path, video_args):
+        """
+        Encodes input_path to output_path with one -vf chain. video_args(encoder) returns the
+        (video filter chain, output encoding args) pair for that encoder.
+        """
+        def build_cmd(encoder):
+            video_filter, output_args = video_args(encoder)
+            return ['ffmpeg', '-y', '-i', input_path, '-vf', video_filter, *output_args, output_path]
+        self._run_ffmpeg(build_cmd)
 
     def _ensure_dir(self, directory):
-        if not os.path.exists(directory):
-            os.makedirs(directory)
+        if directory in self._known_dirs:
+            return
+        # exist_ok: several worker processes may create the same output directory concurrently.
+        os.makedirs(directory, exist_ok=True)
+        self._known_dirs.add(directory)
+
+    def _resolve_output_path(self, platform, output_filename, output_path=None):
+        """
+        Returns output_path, defaulting to <base_output_dir>/<platform>/<output_filename>,
+        and makes sure its directory exists.
+        """
+        if output_path is None:
+            output_path = os.path.join(self.base_output_dir, platform, output_filename)
+        self._ensure_dir(os.path.dirname(output_path))
+        return output_path
+
+    def _get_source_name(self, input_path):
+        # In-memory buffers (e.g. BytesIO) carry their original filename on a `name` attribute.
+        if isinstance(input_path, str):
+            return input_path
+        return getattr(input_path, "name", "")
+
+    def _copy_source(self, input_path, output_path):
+        """
+        Copies a file path or in-memory buffer verbatim to output_path.
+        Returns output_path, or None if the source file does not exist.
+        """
+        if isinstance(input_path, str):
+            try:
+                copy_file(input_path, output_path)
+            except FileNotFoundError:
+                logging.error(f"Source file not found: {input_path}")
+                return None
+        else:
+            with open(output_path, "wb") as f:
+                f.write(input_path.getbuffer())
+        return output_path
+
+    def decode_once(self, input_path, min_edge=None):
+        """
+        Decodes an image a single time so the pixels can be shared across several
+        simulations through their `image` argument. Returns None if it can't be decoded.
+        min_edge: if set, large JPEGs may be decoded at a reduced scale that keeps both
+        dimensions at least this big (see DECODE_MIN_EDGE).
+        """
+        try:
+            with Image.open(input_path) as img:
+                _draft(img, (min_edge, min_edge) if min_edge else None)
+                img.load()
+                return img
+        except Exception as e:
+            logging.error(f"Could not decode {os.path.basename(self._get_source_name(input_path))}: {e}")
+            return None
+
+    def _open_image(self, input_path, image=None, max_edge=None):
+        # Prefer an already-decoded image; callers must not mutate it in place.
+        if image is not None:
+            return image
+        img = Image.open(input_path)
+        if max_edge:
+            # The caller only keeps a long edge of max_edge, so a JPEG can be decoded at the
+            # smallest DCT scale whose long edge still reaches it.
+            width, height = img.size
+            long_edge = max(width, height)
+            _draft(img, (-(-width * max_edge // long_edge), -(-height * max_edge // long_edge)))
+        return img
 
     def _get_video_dimensions(self, input_path):
-        cmd = [
-            "ffprobe", "-v", "error", "-select_streams", "v:0",
-            "-show_entries", "stream=width,height", "-of", "csv=s=x:p=0", input_path
-        ]
         try:
-            output = subprocess.check_output(cmd).decode("utf-8").strip()
-            width, height = map(int, output.split('x'))
-            return width, height
+            stat = os.stat(input_path)
+            return _probe_video_dimensions(input_path, stat.st_mtime_ns, stat.st_size)
         except Exception as e:
             logging.error(f"Error getting video dimensions: {e}")
             return None, None
@@ -37,47 +316,48 @@ class SocialMediaSimulator:
     # =========================================================================
     # FACEBOOK
     # =========================================================================
-    def facebook(self, input_path):
+    @_writes_atomically
+    def facebook(self, input_path, image=None, output_path=None):
         """
         Simulates Facebook's pipeline:
         1. Strips Metadata
         2. Converts to sRGB
         3. Resizes to max 2048px
         4. Applies JPEG compression with 4:2:0 subsampling
+        image: optional pre-decoded PIL image of input_path (see decode_once).
+        output_path: where to write the result (defaults to facebook/TEMPOUT.jpg).
+        Returns the output path on success, None otherwise.
         """
-        output_dir = os.path.join(self.base_output_dir, "facebook")
-        self._ensure_dir(output_dir)
+        output_path = self._resolve_output_path("facebook", "TEMPOUT.jpg", output_path)
 
         try:
-            logging.info(f"Facebook Processing: {os.path.basename(input_path)}")
-            original_image = Image.open(input_path)
+            logging.info(f"Facebook Processing: {os.path.basename(self._get_source_name(input_path))}")
+            max_dimension = 2048
+            original_image = self._open_image(input_path, image, max_edge=max_dimension)
             
             # 1. Convert to sRGB
-            working_image = original_image.convert("RGB")
+            working_image = original_image if original_image.mode == "RGB" else original_image.convert("RGB")
+            # Images without an embedded profile are taken as sRGB already, so there is nothing to do.
             try:
-                srgb_profile = ImageCms.createProfile("sRGB")
-                if "icc_profile" in original_image.info:
-                    input_profile = ImageCms.getOpenProfile(original_image.info["icc_profile"])
-                    working_image = ImageCms.profileToProfile(working_image, input_profile, srgb_profile, outputMode="RGB")
-                else:
-                    working_image = ImageCms.profileToProfile(working_image, srgb_profile, srgb_profile, outputMode="RGB")
+                if original_image.info.get("icc_profile"):
+                    working_image = ImageCms.applyTransform(working_image, _to_srgb_transform(original_image.info["icc_profile"]))
             except Exception:
                  working_image = working_image.convert("RGB")
 
-            # 2. Resize to max 2048px
-            max_dimension = 2048
+            # 2. Resize to max 2048px. reducing_gap box-reduces very large inputs first, so the
+            # LANCZOS pass runs on at most 3x the output size with no visible difference.
             width, height = working_image.size
             if max(width, height) > max_dimension:
                 scale_factor = max_dimension / max(width, height)
                 new_size = (int(width * scale_factor), int(height * scale_factor))
-                working_image = working_image.resize(new_size, Image.Resampling.LANCZOS)
+                working_image = working_image.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
                 logging.info(f"Downscaled to {new_size}")
 
-            output_path = os.path.join(output_dir, "TEMPOUT.jpg")
-
-
-            working_image.save(output_path, "JPEG", quality=85, optimize=True, subsampling=0)
+            # optimize=True would add a second Huffman pass for ~1-3% smaller files; not worth
+            # doubling encode time in dataset generation.
+            working_image.save(output_path, "JPEG", quality=85, subsampling=2)
             logging.info(f"Saved to: {output_path}")
+            return output_path
 
         except Exception as e:
             logging.error(f"Facebook pipeline failed: {e}")
@@ -85,96 +365,91 @@ class SocialMediaSimulator:
     # =========================================================================
     # INSTAGRAM
     # =========================================================================
-    def instagram(self, input_path, post_type='feed'):
+    @_writes_atomically
+    def instagram(self, input_path, post_type='feed', image=None, output_path=None):
         """
         Simulates Instagram.
         post_type: 'feed', 'reel', or 'story'.
+        image: optional pre-decoded PIL image of input_path (see decode_once).
+        output_path: where to write the result (defaults to instagram/TEMPOUT.<ext>).
+        Returns the output path on success, None otherwise.
         """
-        output_dir = os.path.join(self.base_output_dir, "instagram")
-        self._ensure_dir(output_dir)
-
-        ext = os.path.splitext(input_path)[1].lower()
+        ext = os.path.splitext(self._get_source_name(input_path))[1].lower()
         is_video = ext.lower() in ['.mp4', '.mov', '.avi', '.mkv', '.webm']
         
         output_filename = "TEMPOUT.mp4" if is_video else "TEMPOUT.jpg"
-        output_path = os.path.join(output_dir, output_filename)
+        output_path = self._resolve_output_path("instagram", output_filename, output_path)
 
         logging.info(f"Instagram Processing ({post_type.upper()})")
 
         if not is_video:
             try:
-                with Image.open(input_path) as img:
-                    img = img.convert('RGB')
+                with self._open_image(input_path, image) as img:
+                    if img.mode != 'RGB': img = img.convert('RGB')
                     width, height = img.size
                     aspect_ratio = width / height
                     target_width = 1080
 
 
                     if post_type == 'feed':
-                        if aspect_ratio < 0.8:
-                            new_height = int(width / 0.8)
-                            top = (height - new_height) // 2
-                            img = img.crop((0, top, width, top + new_height))
-                        elif aspect_ratio > 1.91:
-                            new_width = int(height * 1.91)
-                            left = (width - new_width) // 2
-                            img = img.crop((left, 0, left + new_width, height))
-                        
-                        new_height = int(target_width / img.size[0] * img.size[1])
-                        img = img.resize((target_width, new_height), Image.Resampling.LANCZOS)
+                        # Feed posts keep their aspect ratio within 4:5 .. 1.91:1; fit() centre-crops
+                        # to the clamped ratio and scales in one resize.
+                        target_height = int(target_width / min(max(aspect_ratio, 0.8), 1.91))
+                        img = ImageOps.fit(img, (target_width, target_height), method=Image.Resampling.LANCZOS)
 
                     elif post_type in ['story', 'reel']:
                         target_height = 1920
                         img = ImageOps.fit(img, (target_width, target_height), method=Image.Resampling.LANCZOS)
 
-                    img.save(output_path, "JPEG", quality=80, optimize=True, subsampling=0)
+                    img.save(output_path, "JPEG", quality=80, subsampling=2)
                     logging.info(f"Saved Image: {output_path}")
+                    return output_path
             except Exception as e:
                 logging.error(f"IG image pipeline failed: {e}")
 
         else:
             # Video Logic (FFmpeg)
-            vf_filters = []
-            audio_channels = "2"
-            target_bitrate = "3000k"
-
-            if post_type == 'feed':
-                vf_filters = ["scale=1080:-2", "crop=1080:min(ih\\,1350):0:(ih-oh)/2"]
-                target_bitrate = "3500k"
-            elif post_type in ['story', 'reel']:
-                vf_filters = ["scale=1080:-2", "crop=1080:1920:0:(ih-oh)/2"]
-                if post_type == 'story': audio_channels = "1"
-
-            cmd = [
-                "ffmpeg", "-y", "-i", input_path,
-                "-vf", ",".join(vf_filters),
-                "-c:v", "libx264", "-preset", "fast",
-                "-b:v", target_bitrate, "-maxrate", target_bitrate, "-bufsize", target_bitrate,
-                "-c:a", "aac", "-b:a", "128k", "-ac", audio_channels,
-                "-map_metadata", "-1", "-movflags", "+faststart",
-                output_path
-            ]
             try:
-                subprocess.run(cmd, check=True, stderr=subprocess.DEVNULL)
+                self._encode_video(input_path, output_path, functools.partial(self._instagram_video_args, post_type))
                 logging.info(f"Saved Video: {output_path}")
+                return output_path
             except Exception:
                 logging.error("IG video pipeline failed.")
 
+    def _instagram_video_args(self, post_type, encoder='libx264'):
+        # Returns (video filter chain, output encoding args) for an Instagram video.
+        vf_filters = []
+        audio_channels = "2"
+        target_bitrate = "3000k"
+
+        if post_type == 'feed':
+            vf_filters = ["scale=1080:-2", "crop=1080:min(ih\\,1350):0:(ih-oh)/2"]
+            target_bitrate = "3500k"
+        elif post_type in ['story', 'reel']:
+            vf_filters = ["scale=1080:-2", "crop=1080:1920:0:(ih-oh)/2"]
+            if post_type == 'story': audio_channels = "1"
+
+        return ",".join(vf_filters) or "null", [
+            *self._h264_args("faster", encoder),
+            "-b:v", target_bitrate, "-maxrate", target_bitrate, "-bufsize", target_bitrate,
+            "-c:a", "aac", "-b:a", "128k", "-ac", audio_channels,
+            "-map_metadata", "-1", "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+        ]
+
     # =========================================================================
     # WHATSAPP
     # =========================================================================
-    def whatsapp(self, input_path, quality_mode='standard', upload_type='media'):
+    @_writes_atomically
+    def whatsapp(self, input_path, quality_mode='standard', upload_type='media', image=None, output_path=None):
         """
         Simulates WhatsApp.
         quality_mode: 'standard' or 'high' (HD).
         upload_type: 'media' (Gallery) or 'document' (Files).
+        image: optional pre-decoded PIL image of input_path (see decode_once).
+        output_path: where to write the result (defaults to whatsapp/TEMPOUT.<ext>).
+        Returns the output path on success, None otherwise.
         """
-        if not os.path.exists(input_path): return
-
-        output_dir = os.path.join(self.base_output_dir, "whatsapp")
-        self._ensure_dir(output_dir)
-
-        ext = os.path.splitext(input_path)[1].lower()
+        ext = os.path.splitext(self._get_source_name(input_path))[1].lower()
         is_image = ext in ['.jpg', '.jpeg', '.png', '.heic', '.webp', '.tiff']
         is_video = ext in ['.mp4', '.mov', '.avi', '.mkv']
         
@@ -187,64 +462,72 @@ class SocialMediaSimulator:
         else:
              output_filename = "TEMPOUT" + ext
         
-        output_path = os.path.join(output_dir, output_filename)
+        output_path = self._resolve_output_path("whatsapp", output_filename, output_path)
         logging.info(f"WhatsApp Processing ({upload_type.upper()}/{quality_mode.upper()})")
 
         if upload_type == 'document':
-            shutil.copy2(input_path, output_path)
+            if not self._copy_source(input_path, output_path):
+                return None
             logging.info("Document Copy complete.")
-            return
+            return output_path
 
         if is_image:
-            self._whatsapp_process_image(input_path, output_path, quality_mode)
+            return self._whatsapp_process_image(input_path, output_path, quality_mode, image)
         elif is_video:
-            self._whatsapp_process_video(input_path, output_path, quality_mode)
+            return self._whatsapp_process_video(input_path, output_path, quality_mode)
 
-    def _whatsapp_process_image(self, input_path, output_path, quality_mode):
+    def _whatsapp_process_image(self, input_path, output_path, quality_mode, image=None):
         try:
-            with Image.open(input_path) as img:
+            max_edge = 4096 if quality_mode == 'high' else 1600
+            with self._open_image(input_path, image, max_edge=max_edge) as img:
                 if img.mode in ('RGBA', 'P'): img = img.convert('RGB')
                 
-                max_edge = 4096 if quality_mode == 'high' else 1600
                 width, height = img.size
                 if max(width, height) > max_edge:
                     ratio = max_edge / max(width, height)
-                    img = img.resize((int(width * ratio), int(height * ratio)), Image.Resampling.LANCZOS)
+                    # HD keeps LANCZOS; for standard-quality previews JPEG quantisation hides
+                    # the difference and BICUBIC's smaller kernel is much cheaper.
+                    resample = Image.Resampling.LANCZOS if quality_mode == 'high' else Image.Resampling.BICUBIC
+                    img = img.resize((int(width * ratio), int(height * ratio)), resample, reducing_gap=3.0)
                 
                 jpg_quality = 80 if quality_mode == 'high' else 70
-                img.save(output_path, 'JPEG', quality=jpg_quality, optimize=True)
+                img.save(output_path, 'JPEG', quality=jpg_quality)
                 logging.info(f"Saved Image: {output_path}")
+                return output_path
         except Exception as e:
             logging.error(f"WhatsApp Image failed: {e}")
 
-    def _whatsapp_process_video(self, input_path, output_path, quality_mode):
-        scale = "scale=-2:720" if quality_mode == 'high' else "scale=-2:480"
+    def _whatsapp_video_args(self, quality_mode, encoder='libx264'):
+        # Returns (video filter chain, output encoding args) for a WhatsApp video.
+        # fast_bilinear: at these bitrates x264 quantisation swamps the scaler's quality.
+        scale = "scale=-2:720:flags=fast_bilinear" if quality_mode == 'high' else "scale=-2:480:flags=fast_bilinear"
         bitrate = "3M" if quality_mode == 'high' else "1.5M"
-        
-        cmd = [
-            'ffmpeg', '-y', '-i', input_path,
-            '-c:v', 'libx264', '-c:a', 'aac',
-            '-vf', f"{scale},fps=30",
+        return f"{scale},fps=30", [
+            *self._h264_args('faster', encoder), '-c:a', 'aac',
             '-b:v', bitrate, '-map_metadata', '-1',
-            output_path
+            '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
         ]
+
+    def _whatsapp_process_video(self, input_path, output_path, quality_mode):
         try:
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self._encode_video(input_path, output_path, functools.partial(self._whatsapp_video_args, quality_mode))
             logging.info(f"Saved Video: {output_path}")
+            return output_path
         except Exception:
             logging.error("WhatsApp Video failed.")
 
     # =========================================================================
     # SIGNAL
     # =========================================================================
-    def signal(self, input_path, quality_setting='standard', as_document=False):
-        """Simulates Signal's privacy-focused pipeline."""
-        if not os.path.exists(input_path): return
-
-        output_dir = os.path.join(self.base_output_dir, "signal")
-        self._ensure_dir(output_dir)
-        
-        ext = os.path.splitext(input_path)[1].lower()
+    @_writes_atomically
+    def signal(self, input_path, quality_setting='standard', as_document=False, image=None, output_path=None):
+        """
+        Simulates Signal's privacy-focused pipeline.
+        image: optional pre-decoded PIL image of input_path (see decode_once).
+        output_path: where to write the result (defaults to signal/TEMPOUT.<ext>).
+        Returns the output path on success, None otherwise.
+        """
+        ext = os.path.splitext(self._get_source_name(input_path))[1].lower()
         is_image = ext in ['.jpg', '.jpeg', '.png', '.heic', '.webp', '.tiff']
         is_video = ext in ['.mp4', '.mov', '.avi', '.mkv']
 
@@ -257,70 +540,75 @@ class SocialMediaSimulator:
         else:
              output_filename = "TEMPOUT" + ext
 
-        output_path = os.path.join(output_dir, output_filename)
+        output_path = self._resolve_output_path("signal", output_filename, output_path)
 
         logging.info(f"Signal Processing (Quality: {quality_setting.upper()})")
         
         if as_document:
-            shutil.copy2(input_path, output_path)
+            if not self._copy_source(input_path, output_path):
+                return None
             logging.info("Document Copy complete.")
-            return
+            return output_path
 
         if is_image:
-            self._signal_process_image(input_path, output_path, quality_setting)
+            return self._signal_process_image(input_path, output_path, quality_setting, image)
         elif is_video:
-            self._signal_process_video(input_path, output_path)
+            return self._signal_process_video(input_path, output_path)
         else:
             logging.warning("Unsupported media type for Signal.")
 
-    def _signal_process_image(self, input_path, output_path, quality_setting):
+    def _signal_process_image(self, input_path, output_path, quality_setting, image=None):
         try:
-            with Image.open(input_path) as img:
+            max_edge = 4096 if quality_setting == 'high' else 1600
+            with self._open_image(input_path, image, max_edge=max_edge) as img:
                 if img.mode != 'RGB': img = img.convert('RGB')
                 
-                max_edge = 4096 if quality_setting == 'high' else 1600
                 width, height = img.size
                 if max(width, height) > max_edge:
                     ratio = max_edge / max(width, height)
-                    img = img.resize((int(width * ratio), int(height * ratio)), Image.Resampling.LANCZOS)
+                    resample = Image.Resampling.LANCZOS if quality_setting == 'high' else Image.Resampling.BICUBIC
+                    img = img.resize((int(width * ratio), int(height * ratio)), resample, reducing_gap=3.0)
                 
                 # Signal specifically strips metadata in media mode
                 img.save(output_path, 'JPEG', quality=80)
                 logging.info(f"Metadata stripped. Resized to {img.size}. Saved to: {output_path}")
+                return output_path
         except Exception as e:
             logging.error(f"Signal image processing failed: {e}")
 
-    def _signal_process_video(self, input_path, output_path):
-
-        scale = "scale=-2:640" 
+    def _signal_video_args(self, encoder='libx264'):
+        # Returns (video filter chain, output encoding args) for a Signal video.
+        scale = "scale=-2:640:flags=fast_bilinear" 
         bitrate = "1.5M"       
-        
-        cmd = [
-            'ffmpeg', '-y', '-i', input_path,
-            '-c:v', 'libx264', '-c:a', 'aac',
-            '-vf', f"{scale},fps=30",
-            '-b:v', bitrate, '-maxrate', bitrate, '-bufsize', f"{float(bitrate[:-1])*2}M",
+        bufsize = "3M"  # two seconds of bitrate
+        return f"{scale},fps=30", [
+            *self._h264_args('faster', encoder), '-c:a', 'aac',
+            '-b:v', bitrate, '-maxrate', bitrate, '-bufsize', bufsize,
             '-map_metadata', '-1', 
-            output_path
+            '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
         ]
-        logging.info(f"Applying aggressive video compression (Max 640p, {bitrate} bitrate)...")
+
+    def _signal_process_video(self, input_path, output_path):
+        logging.info("Applying aggressive video compression (Max 640p, 1.5M bitrate)...")
         try:
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self._encode_video(input_path, output_path, self._signal_video_args)
             logging.info(f"Saved Video: {output_path}")
+            return output_path
         except Exception:
             logging.error("Signal Video failed.")
 
     # =========================================================================
     # TELEGRAM
     # =========================================================================
-    def telegram(self, input_path, as_document=False):
-        """Simulates Telegram's cloud-optimized pipeline."""
-        if not os.path.exists(input_path): return
-
-        output_dir = os.path.join(self.base_output_dir, "telegram")
-        self._ensure_dir(output_dir)
-        
-        ext = os.path.splitext(input_path)[1].lower()
+    @_writes_atomically
+    def telegram(self, input_path, as_document=False, image=None, output_path=None):
+        """
+        Simulates Telegram's cloud-optimized pipeline.
+        image: optional pre-decoded PIL image of input_path (see decode_once).
+        output_path: where to write the result (defaults to telegram/TEMPOUT.<ext>).
+        Returns the output path on success, None otherwise.
+        """
+        ext = os.path.splitext(self._get_source_name(input_path))[1].lower()
         is_image = ext in ['.jpg', '.jpeg', '.png', '.heic', '.webp', '.tiff']
         is_video = ext in ['.mp4', '.mov', '.avi', '.mkv']
         
@@ -333,106 +621,296 @@ class SocialMediaSimulator:
         else:
              output_filename = "TEMPOUT" + ext
 
-        output_path = os.path.join(output_dir, output_filename)
+        output_path = self._resolve_output_path("telegram", output_filename, output_path)
 
         logging.info(f"Telegram Processing (Document: {as_document})")
 
         if as_document:
-            shutil.copy2(input_path, output_path)
+            if not self._copy_source(input_path, output_path):
+                return None
             logging.info(f"Original quality preserved. Saved to: {output_path}")
-            return
+            return output_path
 
         if is_image:
-            self._telegram_process_image(input_path, output_path)
+            return self._telegram_process_image(input_path, output_path, image)
         elif is_video:
-            self._telegram_process_video(input_path, output_path)
+            return self._telegram_process_video(input_path, output_path)
 
 
-    def _telegram_process_image(self, input_path, output_path):
+    def _telegram_process_image(self, input_path, output_path, image=None):
         try:
-            with Image.open(input_path) as img:
-                # Telegram aggressive default compression for photos
-                max_edge = 1280 
+            # Telegram aggressive default compression for photos
+            max_edge = 1280 
+            with self._open_image(input_path, image, max_edge=max_edge) as img:
                 width, height = img.size
                 if max(width, height) > max_edge:
                     ratio = max_edge / max(width, height)
-                    img = img.resize((int(width * ratio), int(height * ratio)), Image.Resampling.LANCZOS)
+                    img = img.resize((int(width * ratio), int(height * ratio)), Image.Resampling.BICUBIC, reducing_gap=3.0)
 
                 img.save(output_path, 'JPEG', quality=85)
                 logging.info(f"Saved Image: {output_path}")
+                return output_path
         except Exception as e:
             logging.error(f"Telegram image processing failed: {e}")
 
-    def _telegram_process_video(self, input_path, output_path):
-
-        scale = "scale=-2:720" 
+    def _telegram_video_args(self, encoder='libx264'):
+        # Returns (video filter chain, output encoding args) for a Telegram video.
+        scale = "scale=-2:720:flags=fast_bilinear" 
         bitrate = "1.8M"  
-
-        cmd = [
-            'ffmpeg', '-y', '-i', input_path,
-            '-c:v', 'libx264', '-c:a', 'aac',
-            '-vf', f"{scale},fps=30",
-            '-b:v', bitrate, '-maxrate', bitrate, '-bufsize', f"{float(bitrate[:-1])*2}M",
+        bufsize = "3.6M"  # two seconds of bitrate
+        return f"{scale},fps=30", [
+            *self._h264_args('faster', encoder), '-c:a', 'aac',
+            '-b:v', bitrate, '-maxrate', bitrate, '-bufsize', bufsize,
             '-map_metadata', '-1',
-            output_path
+            '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
         ]
-        logging.info(f"Applying standard video compression (Max 720p, {bitrate} bitrate)...")
+
+    def _telegram_process_video(self, input_path, output_path):
+        logging.info("Applying standard video compression (Max 720p, 1.8M bitrate)...")
         try:
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self._encode_video(input_path, output_path, self._telegram_video_args)
             logging.info(f"Saved Video: {output_path}")
+            return output_path
         except Exception:
             logging.error("Telegram Video failed.")
 
     # =========================================================================
     # TIKTOK
     # =========================================================================
-    def tiktok(self, input_path):
-        """Simulates TikTok's aggressive broadcast pipeline."""
-        if not os.path.exists(input_path): return
-
-        output_dir = os.path.join(self.base_output_dir, "tiktok")
-        self._ensure_dir(output_dir)
-
-        ext = os.path.splitext(input_path)[1].lower()
+    @_writes_atomically
+    def tiktok(self, input_path, image=None, output_path=None):
+        """
+        Simulates TikTok's aggressive broadcast pipeline.
+        image: optional pre-decoded PIL image of input_path (see decode_once).
+        output_path: where to write the result (defaults to tiktok/TEMPOUT.<ext>).
+        Returns the output path on success, None otherwise.
+        """
+        ext = os.path.splitext(self._get_source_name(input_path))[1].lower()
         is_video = ext in ['.mp4', '.mov', '.avi', '.mkv']
 
         output_filename = "TEMPOUT.mp4" if is_video else "TEMPOUT.jpg"
-        output_path = os.path.join(output_dir, output_filename)
+        output_path = self._resolve_output_path("tiktok", output_filename, output_path)
 
         logging.info("TikTok Processing")
 
         if is_video:
-            # Scale to 1080x1920, Pad with black, Aggressive bitrate
-            video_filters = (
-                "scale=1080:1920:force_original_aspect_ratio=decrease,"
-                "pad=1080:1920:(ow-iw)/2:(oh-ih)/2:black,"
-                "fps=30"
-            )
-            cmd = [
-                'ffmpeg', '-y', '-i', input_path,
-                '-vf', video_filters,
-                '-c:v', 'libx264', '-preset', 'veryfast',
-                '-b:v', '2500k', '-maxrate', '2500k', '-bufsize', '5000k',
-                '-c:a', 'aac', '-b:a', '128k',
-                '-pix_fmt', 'yuv420p', '-map_metadata', '-1',
-                output_path
-            ]
-            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            logging.info(f"Transcoded to Vertical. Bitrate changed to 2.5Mbps. Saved to: {output_path}")
+            try:
+                self._encode_video(input_path, output_path, self._tiktok_video_args)
+                logging.info(f"Transcoded to Vertical. Bitrate changed to 2.5Mbps. Saved to: {output_path}")
+                return output_path
+            except Exception:
+                logging.error("TikTok Video failed.")
         else:
             try:
-                with Image.open(input_path) as img:
-                    if img.mode != 'RGB': img = img.convert('RGB')
-                    
+                with self._open_image(input_path, image) as img:
+                    # Fit inside 1080x1920 keeping the aspect ratio; smaller images are never upscaled.
                     target_size = (1080, 1920)
-                    img.thumbnail(target_size, Image.Resampling.LANCZOS)
-                    
+                    width, height = img.size
+                    ratio = min(target_size[0] / width, target_size[1] / height, 1)
+                    fitted_size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+                    if image is None:
+                        _draft(img, fitted_size)
+
+                    if img.mode != 'RGB': img = img.convert('RGB')
+                    if img.size != fitted_size:
+                        # reducing_gap=2.0 as thumbnail() used: a 3.0 gap skips the cheap box pre-reduction
+                        # for the common 4-6x downscales to 1080 wide.
+                        img = img.resize(fitted_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
                     background = Image.new('RGB', target_size, (0, 0, 0))
                     offset = ((target_size[0] - img.size[0]) // 2, (target_size[1] - img.size[1]) // 2)
                     background.paste(img, offset)
                     
-                    background.save(output_path, quality=85)
+                    background.save(output_path, "JPEG", quality=85)
                     
                     logging.info(f"Padded to 9:16 vertical. Saved to: {output_path}")
+                    return output_path
             except Exception as e:
-                logging.error(f"TikTok image processing failed: {e}")
\ No newline at end of file
+                logging.error(f"TikTok image processing failed: {e}")
+
+    def _tiktok_video_args(self, encoder='libx264'):
+        # Returns (video filter chain, output encoding args) for a TikTok video.
+        # Scale to 1080x1920, Pad with black, Aggressive bitrate
+        video_filters = (
+            "scale=1080:1920:force_original_aspect_ratio=decrease:flags=fast_bilinear,"
+            "pad=1080:1920:(ow-iw)/2:(oh-ih)/2:black,"
+            "fps=30"
+        )
+        return video_filters, [
+            *self._h264_args('veryfast', encoder),
+            '-b:v', '2500k', '-maxrate', '2500k', '-bufsize', '5000k',
+            '-c:a', 'aac', '-b:a', '128k',
+            '-pix_fmt', 'yuv420p', '-map_metadata', '-1', '-movflags', '+faststart',
+        ]
+
+    def _platform_video_args(self, encoder):
+        # {simulation name: (video filter chain, output encoding args)} for every video simulation.
+        return {
+            "instagram_feed": self._instagram_video_args('feed', encoder),
+            "instagram_story": self._instagram_video_args('story', encoder),
+            "instagram_reel": self._instagram_video_args('reel', encoder),
+            "tiktok": self._tiktok_video_args(encoder),
+            "whatsapp_standard_media": self._whatsapp_video_args('standard', encoder),
+            "whatsapp_high_media": self._whatsapp_video_args('high', encoder),
+            "signal_standard_media": self._signal_video_args(encoder),
+            "signal_high_media": self._signal_video_args(encoder),
+            "telegram_media": self._telegram_video_args(encoder),
+        }
+
+    def simulate_all_video(self, input_path):
+        """
+        Runs every simulation in SIMULATION_SPECS on a video with a single ffmpeg process:
+        the input is decoded once and split into one filter chain and encoder per platform,
+        instead of decoding it again for each platform. Simulations with identical settings
+        (Signal ignores its quality setting for video) are encoded once and copied.
+        Outputs and the return value follow run_all; Facebook has no video pipeline and is None.
+        """
+        source_name = self._get_source_name(input_path)
+        stem, ext = os.path.splitext(os.path.basename(source_name))
+        ext = ext.lower()
+
+        video_args = self._platform_video_args('libx264')
+
+        results = {}
+        encoded = {}  # (filter, args) -> first simulation encoded with them
+        duplicates = {}
+        for sim_name in SIMULATION_SPECS:
+            output_dir = os.path.join(self.base_output_dir, sim_name)
+            if sim_name not in video_args and 'document' not in sim_name:
+                # No video pipeline for this platform (Facebook is image-only).
+                results[sim_name] = None
+                continue
+            self._ensure_dir(output_dir)
+            if 'document' in sim_name:
+                # Document uploads are untouched copies of the source.
+                output_path = os.path.join(output_dir, stem + ext)
+                if self._copy_source(input_path, partial_path(output_path)):
+                    os.replace(partial_path(output_path), output_path)
+                    results[sim_name] = output_path
+                else:
+                    results[sim_name] = None
+                continue
+
+            output_path = os.path.join(output_dir, stem + ".mp4")
+            video_filter, output_args = video_args[sim_name]
+            key = (video_filter, tuple(output_args))
+            if key in encoded:
+                duplicates[sim_name] = encoded[key]
+            else:
+                encoded[key] = sim_name
+            results[sim_name] = output_path
+
+        def build_cmd(encoder):
+            args = self._platform_video_args(encoder)
+            filters = []
+            output_cmd = []
+            for i, sim_name in enumerate(encoded.values()):
+                video_filter, output_args = args[sim_name]
+                filters.append(f"[s{i}]{video_filter}[v{i}]")
+                output_cmd += ['-map', f"[v{i}]", '-map', '0:a:0?', *output_args, partial_path(results[sim_name])]
+            split = f"[0:v]split={len(filters)}" + "".join(f"[s{i}]" for i in range(len(filters)))
+            return ['ffmpeg', '-y', '-i', input_path, '-filter_complex', ";".join([split, *filters]), *output_cmd]
+
+        # Every output is encoded to its partial_path and only renamed into place on success.
+        try:
+            self._run_ffmpeg(build_cmd)
+            for sim_name in encoded.values():
+                os.replace(partial_path(results[sim_name]), results[sim_name])
+            logging.info(f"Encoded {len(encoded)} platform videos from one decode of {source_name}")
+        except Exception as e:
+            logging.error(f"Multi-output video simulation failed for {source_name}: {e}")
+            for sim_name in encoded.values():
+                _discard(partial_path(results[sim_name]))
+            for sim_name in video_args:
+                results[sim_name] = None
+            return results
+
+        # A failed copy only loses that simulation; the encoded outputs are already in place.
+        for sim_name, encoded_as in duplicates.items():
+            try:
+                copy_file(results[encoded_as], partial_path(results[sim_name]))
+                os.replace(partial_path(results[sim_name]), results[sim_name])
+            except Exception as e:
+                logging.error(f"Could not copy {encoded_as} video to {sim_name} for {source_name}: {e}")
+                _discard(partial_path(results[sim_name]))
+                results[sim_name] = None
+        return results
+
+    def simulate_videos(self, input_paths, max_workers=None):
+        """
+        Runs simulate_all_video on many videos at once and returns {input path: its results}.
+        Each input is one ffmpeg process running a single-threaded x264 encoder per distinct
+        platform output (currently 8), so by default only cores // outputs inputs run at a time,
+        keeping about one encoder per core. max_workers overrides the number of inputs.
+        The fan-out always encodes with libx264 unless a hardware encoder was explicitly
+        chosen via h264_encoder, since consumer GPU drivers cap concurrent encode sessions
+        (NVENC at about 8) and each input already opens one session per platform. With an
+        explicit hardware encoder, inputs are processed one at a time instead.
+        """
+        h264_encoder = self.h264_encoder or 'libx264'
+        if h264_encoder != 'libx264':
+            max_workers = 1
+        if not max_workers:
+            encodes_per_input = len({(video_filter, tuple(output_args))
+                                     for video_filter, output_args in self._platform_video_args('libx264').values()})
+            max_workers = max(1, (os.cpu_count() or 1) // encodes_per_input)
+        worker = SocialMediaSimulator(self.base_output_dir, ffmpeg_threads=1, h264_encoder=h264_encoder)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(input_paths, executor.map(worker.simulate_all_video, input_paths)))
+
+    def process_all_image(self, input_path):
+        """
+        Runs every simulation in SIMULATION_SPECS on an image in this process, decoding it
+        once (at the reduced JPEG scale DECODE_MIN_EDGE allows) and handing the same pixels
+        to each platform method. Outputs and the return value follow run_all.
+        """
+        source_name = self._get_source_name(input_path)
+        stem, ext = os.path.splitext(os.path.basename(source_name))
+        ext = ext.lower()
+
+        image = self.decode_once(input_path, min_edge=max(DECODE_MIN_EDGE.values()))
+        results = {}
+        for sim_name, (method_name, kwargs) in SIMULATION_SPECS.items():
+            is_document = 'document' in sim_name
+            if image is None and not is_document:
+                results[sim_name] = None
+                continue
+            output_path = os.path.join(self.base_output_dir, sim_name, stem + (ext if is_document else ".jpg"))
+            try:
+                results[sim_name] = getattr(self, method_name)(input_path, image=None if is_document else image,
+                                                               output_path=output_path, **kwargs)
+            except Exception as e:
+                logging.error(f"Simulation '{sim_name}' failed for {source_name}: {e}")
+                results[sim_name] = None
+        return results
+
+    def run_all(self, input_path, max_workers=None):
+        """
+        Runs every simulation in SIMULATION_SPECS on input_path concurrently, one process per
+        simulation, and returns {simulation name: output path, or None if it failed}.
+        Results go to <base_output_dir>/<simulation name>/<input stem><ext>, so no two
+        simulations write the same file. Videos are handed to simulate_all_video instead.
+        """
+        source_name = self._get_source_name(input_path)
+        stem, ext = os.path.splitext(os.path.basename(source_name))
+        ext = ext.lower()
+        if ext in ['.mp4', '.mov', '.avi', '.mkv']:
+            # One ffmpeg process shares the decode across every platform.
+            return self.simulate_all_video(input_path)
+        media_ext = ".jpg"
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            futures = {}
+            for sim_name, (method_name, kwargs) in SIMULATION_SPECS.items():
+                output_ext = ext if 'document' in sim_name else media_ext
+                output_path = os.path.join(self.base_output_dir, sim_name, stem + output_ext)
+                futures[sim_name] = executor.submit(getattr(self, method_name), input_path, output_path=output_path, **kwargs)
+
+            results = {}
+            for sim_name, future in futures.items():
+                try:
+                    results[sim_name] = future.result()
+                except Exception as e:
+                    logging.error(f"Simulation '{sim_name}' failed for {source_name}: {e}")
+                    results[sim_name] = None
+        return results